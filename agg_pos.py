@@ -1,6 +1,26 @@
 import MetaTrader5 as mt5
-from collections import defaultdict
+import numpy as np
 import csv
+import time
+
+POSITION_DTYPE = np.dtype([
+    ("symbol", "U32"),
+    ("volume", "f8"),
+    ("type", "i8"),
+    ("price_open", "f8"),
+])
+
+def positions_to_records(positions):
+    """Pack MT5 position tuples into a structured NumPy array (SoA layout).
+
+    One pass over the positions instead of per-field Python attribute
+    access in every downstream loop.
+    """
+    return np.fromiter(
+        ((pos.symbol, pos.volume, pos.type, pos.price_open) for pos in positions),
+        dtype=POSITION_DTYPE,
+        count=len(positions),
+    )
 
 def initialize_mt5():
     if not mt5.initialize():
@@ -15,73 +35,128 @@ def fetch_positions():
         return None
     return positions
 
-def get_conversion_rate(symbol, currency):
+CONVERSION_MAP = {
+    "ZAR": "USDZAR",
+    "EUR": "EURUSD"
+}
+
+def get_conversion_symbol(currency):
+    return CONVERSION_MAP.get(currency, f"USD{currency}")
+
+# Contract info changes at most on rollover, so cache it across runs of
+# process_positions — repeated invocations (e.g. a refresh loop) skip the
+# per-symbol terminal queries entirely. Ticks are always fetched fresh.
+_SYMBOL_INFO_TTL = 3600.0
+# Failed lookups get a much shorter TTL: a transient terminal hiccup
+# shouldn't blank a symbol out of every refresh for an hour, but hammering
+# the terminal for a genuinely unknown symbol every cycle is no good either.
+_SYMBOL_INFO_NEG_TTL = 30.0
+_SYMBOL_INFO_CACHE = {}  # symbol -> (fetched_at, info)
+
+def get_symbol_info(symbol):
+    cached = _SYMBOL_INFO_CACHE.get(symbol)
+    now = time.monotonic()
+    if cached is not None:
+        fetched_at, info = cached
+        ttl = _SYMBOL_INFO_TTL if info is not None else _SYMBOL_INFO_NEG_TTL
+        if now - fetched_at < ttl:
+            return info
+
+    info = mt5.symbol_info(symbol)
+    _SYMBOL_INFO_CACHE[symbol] = (now, info)
+    return info
+
+def invalidate_symbol_info_cache():
+    """Drop cached symbol info, e.g. after a terminal restart or account switch."""
+    _SYMBOL_INFO_CACHE.clear()
+
+def get_conversion_rate(currency, tick_cache):
     if currency == "USD":
         return 1.0
 
-    conversion_map = {
-        "ZAR": "USDZAR",
-        "EUR": "EURUSD"
-    }
-
-    conversion_symbol = conversion_map.get(currency, f"USD{currency}")
-    tick = mt5.symbol_info_tick(conversion_symbol)
+    tick = tick_cache.get(get_conversion_symbol(currency))
 
     if not tick:
         return 0.0
 
     return tick.ask if currency == "EUR" else 1 / tick.ask
 
+def build_symbol_caches(records):
+    """Query symbol info and ticks once per unique symbol instead of per position."""
+    symbols = set(np.unique(records["symbol"]))
+    info_cache = {symbol: get_symbol_info(symbol) for symbol in symbols}
+
+    conversion_symbols = set()
+    for info in info_cache.values():
+        if info and info.currency_profit != "USD":
+            conversion_symbols.add(get_conversion_symbol(info.currency_profit))
+
+    tick_cache = {symbol: mt5.symbol_info_tick(symbol) for symbol in symbols | conversion_symbols}
+    return info_cache, tick_cache
+
 def process_positions(positions):
-    summary = defaultdict(lambda: {
-        "exposure": 0.0,
-        "volume": 0.0,
-        "lot": 0.0,
-        "contract_size": 0.0,
-        "price": 0.0,
-        "currency": "",
-        "vwap_accum": 0.0,
-        "conversion_rate": 1.0,
-        "gross_usd": 0.0
-    })
-
-    total_gross_usd = 0.0
-
-    for pos in positions:
-        symbol = pos.symbol
-        lot_size = pos.volume
-        direction = pos.type
-
-        symbol_info = mt5.symbol_info(symbol)
-        tick_info = mt5.symbol_info_tick(symbol)
-
-        if not symbol_info or not tick_info:
-            print(f"Missing data for {symbol}")
-            continue
-
-        contract_size = symbol_info.trade_contract_size
-        profit_currency = symbol_info.currency_profit
-        price = tick_info.ask if direction == mt5.ORDER_TYPE_BUY else tick_info.bid
-        exposure = lot_size * contract_size * price
-        volume = contract_size * lot_size
-
-        conversion_rate = get_conversion_rate(symbol, profit_currency)
-        gross_usd = abs(exposure) * conversion_rate
-
-        stats = summary[symbol]
-        stats["exposure"] += exposure if direction == mt5.ORDER_TYPE_BUY else -exposure
-        stats["volume"] += volume
-        stats["lot"] += lot_size
-        stats["contract_size"] = contract_size
-        stats["price"] = price
-        stats["currency"] = profit_currency
-        stats["vwap_accum"] += pos.price_open * volume
-        stats["conversion_rate"] = conversion_rate
-        stats["gross_usd"] += gross_usd
-
-        total_gross_usd += gross_usd
-
-    return summary, total_gross_usd
+    records = positions_to_records(positions)
+    info_cache, tick_cache = build_symbol_caches(records)
+
+    # Drop positions whose symbol info or tick lookup failed
+    valid = np.array([bool(info_cache.get(s)) and bool(tick_cache.get(s))
+                      for s in records["symbol"]])
+    for symbol in np.unique(records["symbol"][~valid]):
+        print(f"Missing data for {symbol}")
+    records = records[valid]
+
+    if len(records) == 0:
+        return {}, 0.0
+
+    symbols = records["symbol"]
+    lots = records["volume"]
+    is_buy = records["type"] == mt5.ORDER_TYPE_BUY
+
+    # Per-position arrays pulled from the caches, then whole-array arithmetic
+    contract = np.array([info_cache[s].trade_contract_size for s in symbols])
+    price = np.where(is_buy,
+                     np.array([tick_cache[s].ask for s in symbols]),
+                     np.array([tick_cache[s].bid for s in symbols]))
+    rates = np.array([get_conversion_rate(info_cache[s].currency_profit, tick_cache)
+                      for s in symbols])
+
+    exposure = lots * contract * price
+    volume = contract * lots
+    gross_usd = np.abs(exposure) * rates
+    signed_exposure = np.where(is_buy, exposure, -exposure)
+    vwap_terms = records["price_open"] * volume
+
+    # Group sums as single C-level bincount reductions over the symbol codes —
+    # no sorted copies of the value arrays, one pass per aggregate
+    unique_syms, inverse = np.unique(symbols, return_inverse=True)
+    last_seen = np.empty(len(unique_syms), dtype=np.intp)
+    last_seen[inverse] = np.arange(len(symbols))
+
+    def group_sum(values):
+        return np.bincount(inverse, weights=values, minlength=len(unique_syms))
+
+    exposure_sums = group_sum(signed_exposure)
+    volume_sums = group_sum(volume)
+    lot_sums = group_sum(lots)
+    vwap_sums = group_sum(vwap_terms)
+    gross_sums = group_sum(gross_usd)
+
+    summary = {}
+    for i, symbol in enumerate(unique_syms):
+        info = info_cache[symbol]
+        summary[symbol] = {
+            "exposure": exposure_sums[i],
+            "volume": volume_sums[i],
+            "lot": lot_sums[i],
+            "contract_size": info.trade_contract_size,
+            "price": price[last_seen[i]],
+            "currency": info.currency_profit,
+            "vwap_accum": vwap_sums[i],
+            "conversion_rate": get_conversion_rate(info.currency_profit, tick_cache),
+            "gross_usd": gross_sums[i]
+        }
+
+    return summary, float(gross_usd.sum())
 
 def display_and_export(summary, total_gross_usd, filename="positions_summary.csv"):
     headers = [
@@ -1,4 +1,5 @@
 import MetaTrader5 as mt5
+from concurrent.futures import ThreadPoolExecutor
 
 # Initialize connection to MetaTrader 5
 if not mt5.initialize():
@@ -13,41 +14,45 @@ if not positions:
 else:
     print(f"🔍 Found {len(positions)} open position(s). Attempting to close...")
 
-    for pos in positions:
-        ticket = pos.ticket
-        symbol = pos.symbol
-        volume = pos.volume
-        position_type = pos.type  # 0 = BUY, 1 = SELL
+    # Fetch each symbol's tick once up front instead of once per position
+    ticks = {symbol: mt5.symbol_info_tick(symbol) for symbol in {p.symbol for p in positions}}
 
-        # Get current price for the symbol
-        tick = mt5.symbol_info_tick(symbol)
+    close_requests = []
+    for pos in positions:
+        tick = ticks.get(pos.symbol)
         if tick is None:
-            print(f"⚠️ Failed to get tick data for {symbol}. Skipping position #{ticket}.")
+            print(f"⚠️ Failed to get tick data for {pos.symbol}. Skipping position #{pos.ticket}.")
             continue
 
         # Determine order type and price
-        order_type = mt5.ORDER_TYPE_SELL if position_type == mt5.POSITION_TYPE_BUY else mt5.ORDER_TYPE_BUY
+        order_type = mt5.ORDER_TYPE_SELL if pos.type == mt5.POSITION_TYPE_BUY else mt5.ORDER_TYPE_BUY
         price = tick.bid if order_type == mt5.ORDER_TYPE_BUY else tick.ask
 
-        # Create close request
-        close_request = {
+        close_requests.append({
             "action": mt5.TRADE_ACTION_DEAL,
-            "symbol": symbol,
-            "volume": volume,
+            "symbol": pos.symbol,
+            "volume": pos.volume,
             "type": order_type,
-            "position": ticket,
+            "position": pos.ticket,
             "price": price,
             "deviation": 10,
             "magic": 0,
             "comment": "Auto-close all trades",
             "type_time": mt5.ORDER_TIME_GTC,
             "type_filling": mt5.ORDER_FILLING_FOK,
-        }
-
-        # Send the close request
-        result = mt5.order_send(close_request)
-        if result.retcode != mt5.TRADE_RETCODE_DONE:
-            print(f"❌ Failed to close position #{ticket} ({symbol}): {result.retcode}")
+        })
+
+    # Closes are independent, and each order_send waits on broker latency —
+    # send them in parallel instead of one at a time
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(mt5.order_send, close_requests))
+
+    for request, result in zip(close_requests, results):
+        ticket = request["position"]
+        symbol = request["symbol"]
+        if result is None or result.retcode != mt5.TRADE_RETCODE_DONE:
+            retcode = result.retcode if result is not None else "no result"
+            print(f"❌ Failed to close position #{ticket} ({symbol}): {retcode}")
         else:
             print(f"✅ Successfully closed position #{ticket} ({symbol})")
 
@@ -0,0 +1,152 @@
+"""
+dukascopy_fetcher.py
+--------------------
+Fetch Dukascopy tick data directly over HTTP, bypassing Node entirely.
+
+dukascopy-node ultimately just downloads per-hour .bi5 blobs
+(LZMA-compressed fixed-width records) from datafeed.dukascopy.com. Hitting
+that endpoint straight from Python with aiohttp removes the subprocess
+spawn, the JSON round-trip for millions of ticks, and the library's 500ms
+pause between batches; the workload is I/O-bound, so one event loop with a
+bounded semaphore scales to hundreds of in-flight hour files on one thread.
+"""
+
+import asyncio
+import lzma
+import os
+from datetime import datetime, timedelta
+
+import aiohttp
+import numpy as np
+import pandas as pd
+
+BASE_URL = "https://datafeed.dukascopy.com/datafeed"
+MAX_CONNECTIONS = 128
+MAX_IN_FLIGHT = 64
+
+# bi5 record layout: ms offset within the hour, integer ask/bid in points,
+# and float ask/bid volumes — all big-endian.
+TICK_DTYPE = np.dtype([
+    ('ms', '>u4'),
+    ('ask', '>u4'),
+    ('bid', '>u4'),
+    ('askvol', '>f4'),
+    ('bidvol', '>f4'),
+])
+
+# Dukascopy stores prices as integers scaled by a per-instrument decimal
+# factor. Plain FX pairs follow the 5-digit convention (3 digits for
+# JPY-quoted pairs); anything else needs an explicit entry here — decoding
+# with the wrong point silently yields prices off by powers of ten.
+_POINT_OVERRIDES = {
+    "XAUUSD": 1e-3,
+    "XAGUSD": 1e-3,
+}
+
+def _point(asset: str) -> float:
+    asset = asset.upper()
+    override = _POINT_OVERRIDES.get(asset)
+    if override is not None:
+        return override
+    if len(asset) == 6 and asset.isalpha():
+        return 1e-3 if asset.endswith("JPY") else 1e-5
+    raise ValueError(
+        f"Unknown point factor for {asset!r}; add it to _POINT_OVERRIDES "
+        "(see dukascopy-node's instrument metadata for the decimal factor)")
+
+def _epoch_ms(date: datetime) -> int:
+    return int((datetime(date.year, date.month, date.day)
+                - datetime(1970, 1, 1)).total_seconds()) * 1000
+
+async def _fetch_hour(session, sem, asset: str, date: datetime, hour: int):
+    # Dukascopy's URL scheme uses zero-based months.
+    url = (f"{BASE_URL}/{asset.upper()}/{date.year}/{date.month - 1:02}/"
+           f"{date.day:02}/{hour:02}h_ticks.bi5")
+    async with sem:
+        async with session.get(url) as resp:
+            if resp.status != 200:
+                return hour, b""
+            return hour, await resp.read()
+
+async def fetch_day(session, sem, asset: str, date: datetime) -> pd.DataFrame:
+    """Fetch and decode all 24 hour files for one day into a DataFrame."""
+    results = await asyncio.gather(
+        *(_fetch_hour(session, sem, asset, date, hour) for hour in range(24)))
+
+    point = _point(asset)
+    day_ms = _epoch_ms(date)
+
+    hour_columns = []
+    for hour, raw in results:
+        if not raw:
+            continue
+        buf = lzma.decompress(raw)
+        arr = np.frombuffer(buf, dtype=TICK_DTYPE)
+        if arr.size == 0:
+            continue
+        hour_ms = day_ms + hour * 3_600_000
+        hour_columns.append({
+            'timestamp': hour_ms + arr['ms'].astype(np.int64),
+            'askPrice': arr['ask'] * point,
+            'bidPrice': arr['bid'] * point,
+            'askVolume': arr['askvol'].astype(np.float64),
+            'bidVolume': arr['bidvol'].astype(np.float64),
+        })
+
+    if not hour_columns:
+        return pd.DataFrame()
+
+    # Columnar (SoA) build: one concatenate per field, no per-tick Python work
+    columns = {name: np.concatenate([cols[name] for cols in hour_columns])
+               for name in hour_columns[0]}
+    return pd.DataFrame.from_dict(columns)
+
+async def _fetch_and_store(asset: str, start_date: datetime, end_date: datetime,
+                           save_dir: str, step_days: int = 7):
+    """Fetch [start_date, end_date) in week-sized bursts, writing each day
+    as soon as its burst lands.
+
+    One session for the whole range: sockets are kept alive across the
+    thousands of hour-file requests instead of re-handshaking TLS, and DNS
+    answers are cached for the duration. Gathering a week at a time keeps
+    the download pipe full while bounding memory to a week of ticks — a
+    whole-range gather would buffer a multi-year backfill before the first
+    row hit disk.
+    """
+    connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS, ttl_dns_cache=300,
+                                     keepalive_timeout=60)
+    sem = asyncio.Semaphore(MAX_IN_FLIGHT)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        date = start_date
+        while date < end_date:
+            chunk_end = min(date + timedelta(days=step_days), end_date)
+            days = [date + timedelta(days=i) for i in range((chunk_end - date).days)]
+            frames = await asyncio.gather(
+                *(fetch_day(session, sem, asset, d) for d in days))
+            for day, df in zip(days, frames):
+                if df.empty:
+                    print(f"⚠️ No data for {asset} {day.date().isoformat()}")
+                    continue
+                store_day_parquet(df, asset, day, save_dir)
+                print(f"✅ Saved {asset} {day.date().isoformat()} ({len(df)} ticks)")
+            date = chunk_end
+
+def store_day_parquet(df: pd.DataFrame, asset: str, date: datetime,
+                      save_dir: str = "tick_parquet"):
+    """Write one day's ticks as a Hive-partitioned Parquet file.
+
+    One file per (symbol, day), append-free and safe to write from many
+    workers at once — unlike a shared HDF file, where every day becomes
+    another PyTables node and writes must be serialized. Bulk reads push
+    partition filters down to PyArrow:
+    pd.read_parquet(save_dir, filters=[('symbol', '=', asset)]).
+    """
+    out_dir = os.path.join(save_dir, f"symbol={asset}", f"year={date.year}",
+                           f"month={date.month:02}", f"day={date.day:02}")
+    os.makedirs(out_dir, exist_ok=True)
+    df.to_parquet(os.path.join(out_dir, "data.parquet"),
+                  compression='zstd', index=False)
+
+def fetch_and_store_tick_data(start_date: datetime, end_date: datetime, asset: str,
+                              save_dir: str = "tick_parquet"):
+    asyncio.run(_fetch_and_store(asset, start_date, end_date, save_dir))
@@ -1,49 +1,249 @@
 import subprocess
 import json
+import os
+import threading
 from datetime import datetime, timedelta
 
-def fetch_tick_data_for_day(asset: str, date: datetime) -> list:
+import numpy as np
+import pandas as pd
+
+from store_tick_data import store_tick_data_into
+
+_RAW_DIR = os.path.dirname(os.path.abspath(__file__))
+_SERVER_JS = os.path.join(_RAW_DIR, "fetcher_server.js")
+_ONESHOT_JS = os.path.join(_RAW_DIR, "fetcher.js")
+
+# Record layout fetcher_server.js writes to its temp files
+BIN_TICK_DTYPE = np.dtype([
+    ('timestamp', '<u8'),
+    ('ask', '<f4'),
+    ('bid', '<f4'),
+    ('askvol', '<f4'),
+    ('bidvol', '<f4'),
+])
+
+# FX ticks carry ~6 significant digits — float32 holds them, halving the
+# bytes the store writes downstream
+_RECORD_DTYPES = {
+    'timestamp': 'int64',
+    'askPrice': 'float32',
+    'bidPrice': 'float32',
+    'askVolume': 'float32',
+    'bidVolume': 'float32',
+}
+
+def _frame_from_bin(path: str) -> pd.DataFrame:
+    arr = np.fromfile(path, dtype=BIN_TICK_DTYPE)
+    return pd.DataFrame({
+        'timestamp': arr['timestamp'].astype(np.int64),
+        'askPrice': arr['ask'],
+        'bidPrice': arr['bid'],
+        'askVolume': arr['askvol'],
+        'bidVolume': arr['bidvol'],
+    })
+
+class NodeFetcher:
+    """A long-lived Node process serving fetch requests over stdin/stdout.
+
+    Spawning `node -e ...` per (symbol, day) pays Node startup plus
+    require('dukascopy-node') every call — hundreds of ms before any network
+    I/O. One persistent process keeps the module and its HTTP keep-alive pool
+    hot across requests. Tick payloads come back as packed binary temp
+    files (see BIN_TICK_DTYPE) rather than JSON, so only a one-line
+    {path, rows} response crosses the pipe.
+
+    Responses are bounded by a kill timer: readline has no timeout, so a
+    stalled Dukascopy connection inside Node would otherwise hang the
+    calling worker (and its lock) forever. Killing the process unblocks
+    readline with EOF; the caller falls back to the one-shot path and the
+    next _get_fetcher() call respawns a fresh process.
+    """
+
+    # Generous because one request can span a week of hour files; the
+    # one-shot fallback budgets 90s for a single day.
+    RESPONSE_TIMEOUT = 300.0
+
+    def __init__(self):
+        self._proc = subprocess.Popen(
+            ['node', _SERVER_JS],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=1,
+            text=True
+        )
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def alive(self):
+        return self._proc.poll() is None
+
+    def fetch(self, asset: str, start: datetime, end: datetime) -> pd.DataFrame:
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            request = {
+                "id": request_id,
+                "instrument": asset,
+                "from": start.date().isoformat(),
+                "to": end.date().isoformat(),
+            }
+            self._proc.stdin.write(json.dumps(request) + "\n")
+            self._proc.stdin.flush()
+            watchdog = threading.Timer(self.RESPONSE_TIMEOUT, self._proc.kill)
+            watchdog.start()
+            try:
+                line = self._proc.stdout.readline()
+            finally:
+                watchdog.cancel()
+
+        if not line:
+            raise RuntimeError("fetcher_server.js exited or timed out")
+
+        response = json.loads(line)
+        if response.get("id") != request_id:
+            # The pipe is out of sync (e.g. a late reply from a killed
+            # request) — retire this process rather than mispair responses
+            self._proc.kill()
+            raise RuntimeError(
+                f"fetcher_server.js response id {response.get('id')} != {request_id}")
+        if response.get("error"):
+            print(f"❌ Node.js error on {start.date().isoformat()}: {response['error']}")
+            return pd.DataFrame()
+
+        bin_path = response.get("path")
+        if not bin_path or not response.get("rows"):
+            return pd.DataFrame()
+
+        try:
+            return _frame_from_bin(bin_path)
+        finally:
+            os.unlink(bin_path)
+
+    def close(self):
+        if self.alive():
+            self._proc.stdin.close()
+            self._proc.wait(timeout=10)
+
+# One fetcher per worker thread: 28 workers share 28 hot Node processes
+# instead of spawning one subprocess per day fetched.
+_local = threading.local()
+
+def _get_fetcher() -> NodeFetcher:
+    fetcher = getattr(_local, "fetcher", None)
+    if fetcher is None or not fetcher.alive():
+        fetcher = NodeFetcher()
+        _local.fetcher = fetcher
+    return fetcher
+
+def fetch_tick_data_for_range(asset: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+    try:
+        return _get_fetcher().fetch(asset, start_date, end_date)
+    except (OSError, RuntimeError, json.JSONDecodeError) as e:
+        print(f"⚠️ Persistent fetcher failed on {start_date.date().isoformat()}: {e}, retrying one-shot")
+        frames = []
+        for i in range((end_date - start_date).days):
+            df = _fetch_day_one_shot(asset, start_date + timedelta(days=i))
+            if not df.empty:
+                frames.append(df)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def fetch_tick_data_for_day(asset: str, date: datetime) -> pd.DataFrame:
+    return fetch_tick_data_for_range(asset, date, date + timedelta(days=1))
+
+def fetch_and_store_tick_data(start_date: datetime, end_date: datetime, asset: str,
+                              save_dir: str = "2015_tick_data", step_days: int = 7):
+    """Fetch [start_date, end_date) in week-sized chunks and append to the asset's HDF file.
+
+    One HDFStore handle is held across the whole range: reopening per day
+    re-parses the file's node tree on open and flushes on close, which
+    dominates once a file holds years of day groups.
+
+    The bi5 endpoint is per-hour, so a 1-day window only amortizes the
+    fetch round-trip and dukascopy-node's inter-batch pause over 24 hour
+    files; a week amortizes them over 168. store_tick_data_into splits the
+    combined frame back into per-day groups off the timestamps.
+    """
+    hdf5_path = os.path.join(save_dir, f"{asset}_tick_data.h5")
+    os.makedirs(save_dir, exist_ok=True)
+
+    with pd.HDFStore(hdf5_path, mode='a') as store:
+        date = start_date
+        while date < end_date:
+            chunk_end = min(date + timedelta(days=step_days), end_date)
+            span = f"{date.date().isoformat()} → {chunk_end.date().isoformat()}"
+            df = fetch_tick_data_for_range(asset, date, chunk_end)
+            if not df.empty:
+                store_tick_data_into(store, df, asset)
+                print(f"✅ Saved {asset} {span}")
+            else:
+                print(f"⚠️ No data for {asset} {span}")
+            date = chunk_end
+
+def _fetch_day_one_shot(asset: str, date: datetime) -> pd.DataFrame:
+    """Fallback path: spawn a fresh Node process for a single day's fetch.
+
+    The JS lives in fetcher.js and takes its parameters as argv — no
+    per-call source interpolation for V8 to re-parse, and asset names
+    can't escape into the script. Node emits NDJSON, so the ticks stream
+    through pd.read_json in bounded chunks instead of being buffered as
+    one day-sized stdout string and re-parsed in a second pass. The
+    streaming parse blocks until Node closes stdout, so the 90s limit is
+    a kill timer rather than a wait(timeout=...) that could never fire,
+    and stderr drains on a side thread so Node can't stall on a full pipe
+    mid-stream.
+    """
     next_date = date + timedelta(days=1)
 
-    js_code = f"""
-    const {{ getHistoricalRates }} = require('dukascopy-node');
-    (async () => {{
-      const fromDate = new Date(Date.UTC({date.year}, {date.month - 1}, {date.day}, 0, 0, 0));
-      const toDate = new Date(Date.UTC({next_date.year}, {next_date.month - 1}, {next_date.day}, 0, 0, 0));
-      try {{
-        const data = await getHistoricalRates({{
-          instrument: '{asset}',
-          dates: {{ from: fromDate, to: toDate }},
-          timeframe: 'tick',
-          format: 'json',
-          batchSize: 10,
-          pauseBetweenBatchesMs: 500
-        }});
-        console.log(JSON.stringify(data));
-      }} catch (error) {{
-        console.error("Error:", error.message);
-        process.exit(1);
-      }}
-    }})();"""
+    proc = subprocess.Popen(
+        ['node', _ONESHOT_JS, asset,
+         date.date().isoformat(), next_date.date().isoformat()],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+
+    stderr_chunks = []
+    drain = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()),
+                             daemon=True)
+    drain.start()
+
+    timed_out = threading.Event()
+
+    def _kill():
+        timed_out.set()
+        proc.kill()
+
+    watchdog = threading.Timer(90, _kill)
+    watchdog.start()
 
     try:
-        result = subprocess.run(
-            ['node', '-e', js_code],
-            capture_output=True,
-            text=True,
-            timeout=90
-        )
+        chunks = [chunk for chunk in pd.read_json(proc.stdout, lines=True, chunksize=50_000)
+                  if not chunk.empty]
+        returncode = proc.wait()
+        drain.join(timeout=5)
+
+        if timed_out.is_set():
+            print(f"⏱️ Timeout fetching data for {date.date().isoformat()}")
+            return pd.DataFrame()
+
+        if returncode != 0:
+            stderr = b"".join(stderr_chunks)
+            print(f"❌ Node.js error on {date.date().isoformat()}: {stderr.decode().strip()}")
+            return pd.DataFrame()
 
-        if result.returncode != 0:
-            print(f"❌ Node.js error on {date.strftime('%Y-%m-%d')}: {result.stderr.strip()}")
-            return []
+        if not chunks:
+            return pd.DataFrame()
 
-        return json.loads(result.stdout)
+        df = pd.concat(chunks, ignore_index=True)
+        return df.astype({c: t for c, t in _RECORD_DTYPES.items() if c in df.columns})
 
-    except subprocess.TimeoutExpired:
-        print(f"⏱️ Timeout fetching data for {date.strftime('%Y-%m-%d')}")
-        return []
+    except ValueError as e:
+        # A kill mid-stream surfaces as a truncated-JSON ValueError too
+        proc.kill()
+        if timed_out.is_set():
+            print(f"⏱️ Timeout fetching data for {date.date().isoformat()}")
+        else:
+            print(f"❌ JSON decode error on {date.date().isoformat()}: {e}")
+        return pd.DataFrame()
 
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON decode error on {date.strftime('%Y-%m-%d')}: {e}")
-        return []
\ No newline at end of file
+    finally:
+        watchdog.cancel()
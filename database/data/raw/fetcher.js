@@ -0,0 +1,30 @@
+// fetcher.js
+// One-shot fetch: node fetcher.js <instrument> <from> <to>  (dates as YYYY-MM-DD)
+// Fallback path used when the persistent fetcher_server is unavailable;
+// emits one JSON object per line (NDJSON) so the Python side can stream-parse
+// instead of buffering the whole day's payload as a single string.
+const { getHistoricalRates } = require('dukascopy-node');
+
+const [instrument, from, to] = process.argv.slice(2);
+
+(async () => {
+  try {
+    const data = await getHistoricalRates({
+      instrument: instrument,
+      dates: {
+        from: new Date(from),
+        to: new Date(to)
+      },
+      timeframe: 'tick',
+      format: 'json',
+      batchSize: 10,
+      pauseBetweenBatchesMs: 500
+    });
+    for (const tick of data) {
+      process.stdout.write(JSON.stringify(tick) + '\n');
+    }
+  } catch (error) {
+    console.error('Error:', error.message);
+    process.exit(1);
+  }
+})();
@@ -0,0 +1,63 @@
+// fetcher_server.js
+// Long-lived fetch worker: loads dukascopy-node once, then serves JSON-lines
+// requests from stdin ({id, instrument, from, to}). Tick payloads are written
+// as packed little-endian binary records to a temp file (timestamp u64,
+// ask/bid/askvol/bidvol f32 — 24 bytes per tick) and only the file path and
+// row count travel back over stdout: {id, path, rows} or {id, error}.
+// Piping millions of ticks through JSON.stringify/json.loads costs ~5x the
+// bytes plus a full parse on both sides; np.fromfile on the binary file is
+// a single read.
+const { getHistoricalRates } = require('dukascopy-node');
+const readline = require('readline');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+const RECORD_BYTES = 24;
+
+const rl = readline.createInterface({ input: process.stdin, terminal: false });
+
+rl.on('line', async (line) => {
+  let request;
+  try {
+    request = JSON.parse(line);
+  } catch (error) {
+    process.stdout.write(JSON.stringify({ id: null, error: `bad request: ${error.message}` }) + '\n');
+    return;
+  }
+
+  try {
+    const data = await getHistoricalRates({
+      instrument: request.instrument,
+      dates: {
+        from: new Date(request.from),
+        to: new Date(request.to)
+      },
+      timeframe: 'tick',
+      format: 'json',
+      batchSize: 10,
+      pauseBetweenBatchesMs: 500
+    });
+
+    if (!data.length) {
+      process.stdout.write(JSON.stringify({ id: request.id, rows: 0 }) + '\n');
+      return;
+    }
+
+    const buf = Buffer.alloc(RECORD_BYTES * data.length);
+    data.forEach((t, i) => {
+      const off = i * RECORD_BYTES;
+      buf.writeBigUInt64LE(BigInt(t.timestamp), off);
+      buf.writeFloatLE(t.askPrice, off + 8);
+      buf.writeFloatLE(t.bidPrice, off + 12);
+      buf.writeFloatLE(t.askVolume || 0, off + 16);
+      buf.writeFloatLE(t.bidVolume || 0, off + 20);
+    });
+
+    const binPath = path.join(os.tmpdir(), `ticks_${process.pid}_${request.id}.bin`);
+    fs.writeFileSync(binPath, buf);
+    process.stdout.write(JSON.stringify({ id: request.id, path: binPath, rows: data.length }) + '\n');
+  } catch (error) {
+    process.stdout.write(JSON.stringify({ id: request.id, error: error.message }) + '\n');
+  }
+});
@@ -2,12 +2,14 @@
 
 import argparse
 from datetime import datetime
-from fetch_tick_data import fetch_and_store_tick_data
 
 parser = argparse.ArgumentParser(description="Fetch tick data from Dukascopy")
 parser.add_argument("--start", required=True, help="Start date in YYYY-MM-DD format")
 parser.add_argument("--end", required=True, help="End date in YYYY-MM-DD format")
 parser.add_argument("--asset", required=True, help="Asset symbol (e.g., eurusd, xauusd)")
+parser.add_argument("--backend", choices=["node", "http"], default="node",
+                    help="node: persistent dukascopy-node fetcher into HDF day groups; "
+                         "http: direct bi5 download into Hive-partitioned Parquet")
 
 args = parser.parse_args()
 
@@ -15,4 +17,9 @@ start_date = datetime.strptime(args.start, "%Y-%m-%d")
 end_date = datetime.strptime(args.end, "%Y-%m-%d")
 asset = args.asset
 
-fetch_and_store_tick_data(start_date, end_date, asset)
\ No newline at end of file
+if args.backend == "http":
+    from dukascopy_fetcher import fetch_and_store_tick_data
+else:
+    from fetch_tick_data import fetch_and_store_tick_data
+
+fetch_and_store_tick_data(start_date, end_date, asset)
@@ -1,125 +1,121 @@
-import csv, ast, os
+import logging
+import logging.handlers
+import os
+import queue
+import threading
 from collections import defaultdict
-from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
 from fetch_tick_data import fetch_tick_data_for_day
-
-
-# === Step 1: Parse CSV ===
-csv_file = "missing_day_group.csv"
-instrument_dates = defaultdict(list)
-
-with open(csv_file, newline='', encoding='utf-8') as f:
-    reader = csv.reader(f)
-    next(reader)  # Skip header
-    for row in reader:
-        if len(row) < 2:
-            continue
-        instrument = row[0].strip()
-        try:
-            date_list = ast.literal_eval(row[1])
-            for date_str in date_list:
-                try:
-                    date = datetime.strptime(date_str, "%Y-%m-%d")
-                    instrument_dates[instrument].append(date)
-                except ValueError:
-                    print(f"⚠️ Invalid date format: {date_str}")
-        except Exception as e:
-            print(f"⚠️ Failed to parse date list for {instrument}: {e}")
-
-# === Step 2: Flatten tasks ===
-all_tasks = [(instr, date) for instr, dates in instrument_dates.items() for date in dates]
-
-# === Step 3: Split into 32 chunks ===
-def chunkify(lst, n):
-    avg = len(lst) // n
-    chunks = [lst[i * avg:(i + 1) * avg] for i in range(n)]
-    remainder = lst[n * avg:]
-    for i, item in enumerate(remainder):
-        chunks[i % n].append(item)
-    return chunks
-
-task_chunks = chunkify(all_tasks, 32)
-
-# === Step 4: Worker function ===
-def worker(worker_id, tasks):
-    temp_file = f"temp_worker_{worker_id}.h5"
-    for instrument, date in tasks:
-        try:
-            print(f"🧵 Worker {worker_id}: {instrument} {date.date()}")
-            data = fetch_tick_data_for_day(instrument, date)
-            
-            if data:
-                df = pd.DataFrame(data)
-                ts = pd.to_datetime(df['timestamp'], unit='ms')
-                df['year'] = ts.dt.year
-                df['month'] = ts.dt.month
-                df['day'] = ts.dt.day
-
-                os.makedirs(".", exist_ok=True)
-
-                with pd.HDFStore(temp_file, mode='a') as store:
-                    for (y, m, d), group in df.groupby(['year', 'month', 'day']):
-                        key = f"/{instrument}/y{y}/m{m:02}/d{d:02}"
-                        store.put(key, group.drop(columns=['year', 'month', 'day']), format='table', data_columns=True) 
-                print(f"✅ Worker {worker_id} saved {instrument} {date.date()}")
-            print(f"⚠️ Worker {worker_id} no data for {instrument} {date.date()}")
-        except Exception as e:
-            print(f"❌ Worker {worker_id} error on {instrument} {date.date()}: {e}")
-
-# === Step 5: Run workers in parallel ===
-with ThreadPoolExecutor(max_workers=28) as executor:
-    for i, chunk in enumerate(task_chunks):
-        executor.submit(worker, i, chunk)
+from store_tick_data import store_tick_data_into
+
+logger = logging.getLogger("parallel_patch")
+
+# === Step 4: Task function ===
+# Temp output is an Arrow IPC stream: append-only, constant-time per record
+# batch, no hierarchical keys — unlike a temp HDF file, where each day adds
+# another PyTables node and writes slow down as the node count grows.
+# Instrument rides along as a column; day grouping happens once at merge
+# time off the timestamps. Each thread lazily opens its own stream, so
+# there are at most max_workers temp files.
+_writers_lock = threading.Lock()
+_all_writers = []  # (path, writer) pairs for close + merge
+_thread_local = threading.local()
+
+def _writer_for(schema):
+    writer = getattr(_thread_local, "writer", None)
+    if writer is None:
+        with _writers_lock:
+            temp_file = f"temp_worker_{len(_all_writers)}.arrow"
+            writer = pa.ipc.new_stream(temp_file, schema)
+            _all_writers.append((temp_file, writer))
+        _thread_local.writer = writer
+    return writer
+
+def process_task(instrument, date):
+    try:
+        logger.info("🧵 Fetching %s %s", instrument, date.date())
+        df = fetch_tick_data_for_day(instrument, date)
+
+        if not df.empty:
+            table = pa.Table.from_pandas(df.assign(instrument=instrument),
+                                         preserve_index=False)
+            _writer_for(table.schema).write_table(table)
+            logger.info("✅ Saved %s %s", instrument, date.date())
+        else:
+            logger.warning("⚠️ No data for %s %s", instrument, date.date())
+    except Exception as e:
+        logger.error("❌ Error on %s %s: %s", instrument, date.date(), e)
 
 # === Step 6: Merge temp files (robust version) ===
-def merge_hdf5_files(temp_files, final_file):
+def merge_arrow_files(temp_files, final_file):
+    # Iterate each temp file's record batches instead of read_all(): a batch
+    # is one task's (instrument, day) table, so memory stays bounded by a
+    # day of ticks rather than a worker's whole share of the backlog. The
+    # downstream decompose/merge-to-raw steps still expect HDF day groups,
+    # so each batch is keyed into final_file via store_tick_data_into.
     with pd.HDFStore(final_file, mode='a') as final_store:
         for temp in temp_files:
             if not os.path.exists(temp):
-                print(f"⚠️ Skipping missing file: {temp}")
+                logger.warning("⚠️ Skipping missing file: %s", temp)
                 continue
             try:
-                with pd.HDFStore(temp, mode='r') as temp_store:
-                    keys = temp_store.keys()
-                    if not keys:
-                        print(f"⚠️ Skipping empty file: {temp}")
-                        continue
-                    for key in keys:
-                        df = temp_store[key]
-                        final_store.put(key, df, format='table', data_columns=True)
+                with pa.ipc.open_stream(temp) as reader:
+                    for batch in reader:
+                        df = batch.to_pandas()
+                        for instrument, group in df.groupby('instrument'):
+                            store_tick_data_into(
+                                final_store, group.drop(columns=['instrument']), instrument)
             except Exception as e:
-                print(f"❌ Error reading {temp}: {e}")
+                logger.error("❌ Error reading %s: %s", temp, e)
             finally:
                 try:
                     os.remove(temp)
-                    print(f"🗑️ Deleted temp file: {temp}")
+                    logger.info("🗑️ Deleted temp file: %s", temp)
                 except Exception as e:
-                    print(f"⚠️ Could not delete {temp}: {e}")
-
-temp_files = [f"temp_worker_{i}.h5" for i in range(32)]
-merge_hdf5_files(temp_files, "final_tick_data.h5")
+                    logger.warning("⚠️ Could not delete %s: %s", temp, e)
 
 # === Step 7: Decompose final file into per-instrument files ===
+def split_one(final_file, output_dir, instrument, group_keys):
+    # Runs in a child process: PyTables encode/decode is GIL-holding
+    # C-Python work, so threads serialize here while processes actually
+    # use the cores. Each child opens its own handles, so no state is
+    # shared. Failures propagate to the parent via the future.
+    out_path = os.path.join(output_dir, f"{instrument}_tick_data.h5")
+    with pd.HDFStore(final_file, mode='r') as src, \
+            pd.HDFStore(out_path, mode='w') as out_store:
+        for key in group_keys:
+            # Stream each table in bounded chunks rather than
+            # materializing it whole (src[key] decodes the entire
+            # table into memory first); appends skip per-chunk index
+            # maintenance and the index is built once at the end
+            for chunk in src.select(key, iterator=True, chunksize=200_000):
+                out_store.append(key, chunk, format='table',
+                                 data_columns=True, index=False,
+                                 expectedrows=500_000,
+                                 complib='blosc:zstd', complevel=5)
+            out_store.create_table_index(key, optlevel=9, kind='full')
+
 def decompose_by_instrument(final_file, output_dir="split_by_instrument"):
     os.makedirs(output_dir, exist_ok=True)
     with pd.HDFStore(final_file, mode='r') as store:
-        keys = store.keys()
         instrument_groups = defaultdict(list)
-        for key in keys:
+        for key in store.keys():
             instrument = key.strip("/").split("/")[0]
             instrument_groups[instrument].append(key)
 
-        for instrument, group_keys in instrument_groups.items():
-            out_path = os.path.join(output_dir, f"{instrument}_tick_data.h5")
-            with pd.HDFStore(out_path, mode='w') as out_store:
-                for key in group_keys:
-                    df = store[key]
-                    out_store.put(key, df, format='table', data_columns=True)
-
-decompose_by_instrument("final_tick_data.h5")
-print("✅ All tasks complete. Data split by instrument.")
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = {
+            executor.submit(split_one, final_file, output_dir, instrument, group_keys): instrument
+            for instrument, group_keys in instrument_groups.items()
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error("❌ Decompose failed for %s: %s", futures[future], e)
 
 
 # MERGE TO RAW FILES
@@ -130,34 +126,85 @@ def merge_instrument_file(instrument, fetched_dir="split_by_instrument", raw_dir
     raw_path = os.path.join(raw_dir, f"{instrument}_tick_data.h5")
 
     if not os.path.exists(fetched_path):
-        print(f"⚠️ Fetched file missing: {instrument}")
+        logger.warning("⚠️ Fetched file missing: %s", instrument)
         return
     if not os.path.exists(raw_path):
-        print(f"⚠️ Raw file missing: {instrument}")
+        logger.warning("⚠️ Raw file missing: %s", instrument)
         return
 
     with pd.HDFStore(raw_path, mode='a') as raw_store, pd.HDFStore(fetched_path, mode='r') as fetched_store:
         for key in fetched_store.keys():
             if key in raw_store:
-                print(f"🔁 Skipping duplicate key: {key} in {instrument}")
+                logger.info("🔁 Skipping duplicate key: %s in %s", key, instrument)
                 continue
             df = fetched_store[key]
             raw_store.put(key, df, format='table', data_columns=True)
 
-    print(f"✅ Merged fetched → raw: {instrument}")
+    logger.info("✅ Merged fetched → raw: %s", instrument)
+
+
+def main():
+    # === Logging: workers enqueue, one listener thread writes ===
+    # 28 threads printing per-day progress contend on stdout's lock and hold
+    # the GIL through format+encode; a QueueHandler makes each log call an
+    # O(1) put and the QueueListener drains to the stream from one thread.
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+    listener.start()
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    # === Step 1+2: Parse CSV straight into the flat task list ===
+    # Long-format (instrument, date) rows parse in one vectorized read_csv call
+    csv_file = "missing_day_group.csv"
+    missing = pd.read_csv(csv_file, parse_dates=["date"], engine="pyarrow")
+    all_tasks = list(missing.itertuples(index=False, name=None))
+
+    # === Step 5: Run fetch tasks in parallel (network-bound → threads) ===
+    # One submission per (instrument, date): threads pull the next task as
+    # they finish, so a straggler chewing through heavy EURUSD days no longer
+    # leaves the rest of the pool idle the way equal-length pre-chunking did
+    with ThreadPoolExecutor(max_workers=28) as executor:
+        futures = [executor.submit(process_task, instrument, date)
+                   for instrument, date in all_tasks]
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error("❌ Task failed: %s", e)
+
+    for _, writer in _all_writers:
+        writer.close()
+
+    merge_arrow_files([path for path, _ in _all_writers], "final_tick_data.h5")
+
+    decompose_by_instrument("final_tick_data.h5")
+    logger.info("✅ All tasks complete. Data split by instrument.")
 
+    fetched_dir = "split_by_instrument"     # Correct folder for fetched files
+    raw_dir = "./2015_tick_data"            # Correct folder for raw files
+
+    # Get list of instruments based on fetched files
+    instruments = [
+        filename.replace("_tick_data.h5", "")
+        for filename in os.listdir(fetched_dir)
+        if filename.endswith("_tick_data.h5")
+    ]
+
+    # Run merge in parallel
+    with ThreadPoolExecutor(max_workers=28) as executor:
+        futures = {
+            executor.submit(merge_instrument_file, instrument, fetched_dir, raw_dir): instrument
+            for instrument in instruments
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error("❌ Merge failed for %s: %s", futures[future], e)
 
-fetched_dir = "split_by_instrument"     # Correct folder for fetched files
-raw_dir = "./2015_tick_data"            # Correct folder for raw files
+    listener.stop()
 
-# Get list of instruments based on fetched files
-instruments = [
-    filename.replace("_tick_data.h5", "")
-    for filename in os.listdir(fetched_dir)
-    if filename.endswith("_tick_data.h5")
-]
 
-# Run merge in parallel
-with ThreadPoolExecutor(max_workers=28) as executor:
-    for instrument in instruments:
-        executor.submit(merge_instrument_file, instrument, fetched_dir, raw_dir)
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,16 @@
-import csv
-import ast
-from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+import pandas as pd
 from fetch_tick_data import fetch_and_store_tick_data
 
 # === Path to your CSV file ===
 csv_file = "missing_day_group.csv"
 
 # === Parse CSV and group dates by instrument ===
-instrument_dates = defaultdict(list)
-
-with open(csv_file, newline='', encoding='utf-8') as f:
-    reader = csv.reader(f)
-    next(reader)  # Skip header
-    for row in reader:
-        if len(row) < 2:
-            continue
-        instrument = row[0].strip()
-        try:
-            # Safely parse the stringified list of dates
-            date_list = ast.literal_eval(row[1])
-            for date_str in date_list:
-                try:
-                    date = datetime.strptime(date_str, "%Y-%m-%d")
-                    instrument_dates[instrument].append(date)
-                except ValueError:
-                    print(f"⚠️ Invalid date format: {date_str}")
-        except Exception as e:
-            print(f"⚠️ Failed to parse date list for {instrument}: {e}")
+# Long-format (instrument, date) rows: one vectorized read_csv parse
+# replaces the old per-row ast.literal_eval + strptime loop
+missing = pd.read_csv(csv_file, parse_dates=["date"], engine="pyarrow")
+instrument_dates = missing.groupby("instrument")["date"].apply(list).to_dict()
 
 # === Function to process one instrument's dates ===
 def process_instrument(instrument, dates):
@@ -41,6 +23,15 @@ def process_instrument(instrument, dates):
     print(f"✅ Finished {instrument}")
 
 # === Run each instrument group in parallel ===
+# Keep the futures and drain them with as_completed — fire-and-forget
+# submit() silently swallows any exception raised inside a worker.
 with ThreadPoolExecutor(max_workers=32) as executor:
-    for instrument, dates in instrument_dates.items():
-        executor.submit(process_instrument, instrument, dates)
\ No newline at end of file
+    futures = {
+        executor.submit(process_instrument, instrument, dates): instrument
+        for instrument, dates in instrument_dates.items()
+    }
+    for future in as_completed(futures):
+        try:
+            future.result()
+        except Exception as e:
+            print(f"❌ Worker for {futures[future]} failed: {e}")
\ No newline at end of file
@@ -1,11 +1,12 @@
 import h5py
 from datetime import datetime
 import os
-import csv
 import calendar
 import argparse
 from collections import defaultdict
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
 
 # === Argument parser ===
 def parse_args():
@@ -19,100 +20,160 @@ def parse_args():
 
 # === Dataset validation ===
 def is_dataset_good(dset):
+    # Shape/dtype come from the header and the one-row slice touches a
+    # single chunk — reading dset[...] materialized the whole day's ticks
+    # (tens of MB for a liquid symbol) just to prove the node is readable
     try:
-        _ = dset[...]
+        _ = dset.shape
+        _ = dset.dtype
+        if dset.shape[0] > 0:
+            # A row count with zero allocated storage means the data was
+            # never actually written — catch that from metadata alone
+            if dset.id.get_storage_size() == 0:
+                return False
+            _ = dset[0:1]
         return True
     except Exception:
         return False
 
+# There are only ~12 * years distinct (year, month) pairs but the scan asks
+# for each one once per instrument per file. monthrange's first-weekday
+# (Mon=0) gives every day's weekday by modular arithmetic, so the Saturday
+# filter needs no datetime construction, and the cached tuple means the
+# whole month is worked out exactly once per process.
+@lru_cache(maxsize=None)
+def _valid_day_ints(year, month):
+    first_wd, num_days = calendar.monthrange(year, month)
+    return tuple(day for day in range(1, num_days + 1)
+                 if (first_wd + day - 1) % 7 != 5)
+
 # === Date generator excluding Saturdays ===
 def valid_dates(year, month):
-    num_days = calendar.monthrange(year, month)[1]
-    for day in range(1, num_days + 1):
-        date_obj = datetime(year, month, day)
-        if date_obj.weekday() == 5:  # Saturday
-            continue
-        yield date_obj
+    for day in _valid_day_ints(year, month):
+        yield datetime(year, month, day)
+
+# === Per-instrument scan (runs on a pool thread) ===
+def _scan_instrument(f, instrument, month_pairs, day_groups, table_names,
+                     start_date, end_date):
+    last_good_date = None
+    group_rows = []
+    table_rows = []
+
+    def in_window(date_obj):
+        return ((not start_date or date_obj >= start_date)
+                and (not end_date or date_obj <= end_date))
+
+    for year, month in sorted(month_pairs):
+        # One set difference per month flags every absent day group;
+        # only the days that do exist are visited for table checks
+        expected = {f"{instrument}/y{year}/m{month:02}/d{date_obj.day:02}": date_obj
+                    for date_obj in valid_dates(year, month)}
+
+        # f-string formatting skips strftime's format-spec parse per day
+        for name in sorted(expected.keys() - day_groups):
+            date_obj = expected[name]
+            if in_window(date_obj):
+                group_rows.append([instrument, f"{year}-{month:02}-{date_obj.day:02}"])
+
+        for name in sorted(expected.keys() & day_groups):
+            date_obj = expected[name]
+            date_str = f"{year}-{month:02}-{date_obj.day:02}"
+            if f"{name}/table" in table_names and is_dataset_good(f[name]["table"]):
+                last_good_date = date_str
+            elif in_window(date_obj):
+                table_rows.append([instrument, date_str])
+
+    last_row = [instrument, last_good_date] if last_good_date else None
+    return last_row, group_rows, table_rows
 
 # === HDF5 scanner ===
-def scan_hdf5(file_path, start_date=None, end_date=None):
+def scan_hdf5(file_path, start_date=None, end_date=None, instruments=None):
     last_updates = []
     missing_groups = []
     missing_tables = []
 
-    with h5py.File(file_path, "r") as f:
-        for instrument in f.keys():
-            last_good_date = None
+    # latest-format B-trees walk faster, and a 64MB chunk cache with a
+    # prime slot count keeps the metadata and validated chunks of
+    # many-dataset files resident across the instrument scans
+    with h5py.File(file_path, "r", libver="latest",
+                   rdcc_nbytes=64 * 1024 * 1024, rdcc_nslots=100003) as f:
+        if instruments is None:
+            instruments = list(f.keys())
 
-            for year_key in sorted(f[instrument].keys(), key=lambda x: int(x[1:])):
-                year = int(year_key[1:])
-                year_group = f[instrument][year_key]
+        # One visititems pass per instrument subtree walks the on-disk tree
+        # in C and collects every month group, day group and table name up
+        # front; the expected-day loop below then works on plain set lookups
+        # instead of a KeyError-probing h5py access per day. Walking only
+        # this call's instruments matters when main() splits one file into
+        # several chunk tasks — a whole-file walk per task would re-read the
+        # full metadata tree once per chunk.
+        month_groups = set()
+        day_groups = set()
+        table_names = set()
 
-                for month_key in sorted(year_group.keys(), key=lambda x: int(x[1:])):
-                    month = int(month_key[1:])
-                    month_group = year_group[month_key]
+        def collect_under(prefix):
+            def collect(name, obj):
+                depth = name.count("/")
+                if depth == 1:
+                    month_groups.add(f"{prefix}/{name}")
+                elif depth == 2:
+                    day_groups.add(f"{prefix}/{name}")
+                elif depth == 3 and name.endswith("/table"):
+                    table_names.add(f"{prefix}/{name}")
+            return collect
 
-                    for date_obj in valid_dates(year, month):
-                        date_str = date_obj.strftime("%Y-%m-%d")
-                        day_key = f'd{str(date_obj.day).zfill(2)}'
+        for instrument in instruments:
+            if instrument in f:
+                f[instrument].visititems(collect_under(instrument))
 
-                        try:
-                            day_group = month_group[day_key]
-                            if "table" in day_group and is_dataset_good(day_group["table"]):
-                                last_good_date = date_str
-                            else:
-                                if (not start_date or date_obj >= start_date) and (not end_date or date_obj <= end_date):
-                                    missing_tables.append([instrument, date_str])
-                        except KeyError:
-                            if (not start_date or date_obj >= start_date) and (not end_date or date_obj <= end_date):
-                                missing_groups.append([instrument, date_str])
+        # Build the month list from the month groups themselves, not the day
+        # groups beneath them: a month group with no day children is exactly
+        # the anomaly the scan should flag, and deriving months from day
+        # names would skip it (and drop day-less instruments entirely)
+        months = defaultdict(set)  # instrument -> {(year, month)} present
+        for name in month_groups:
+            instrument, year_key, month_key = name.split("/")
+            months[instrument].add((int(year_key[1:]), int(month_key[1:])))
 
-            if last_good_date:
-                last_updates.append([instrument, last_good_date])
+        # A file holding many instruments was previously walked serially by
+        # its one process-pool worker. The per-instrument scans only share
+        # read-only sets plus the open handle (h5py's internal lock keeps
+        # that safe, and the validation reads release it during I/O), so a
+        # small thread pool overlaps their one-row chunk reads.
+        with ThreadPoolExecutor(max_workers=min(8, max(1, len(instruments)))) as pool:
+            results = pool.map(
+                lambda instrument: _scan_instrument(
+                    f, instrument, months.get(instrument, ()),
+                    day_groups, table_names, start_date, end_date),
+                instruments)
+            for last_row, group_rows, table_rows in results:
+                if last_row:
+                    last_updates.append(last_row)
+                missing_groups.extend(group_rows)
+                missing_tables.extend(table_rows)
 
     return last_updates, missing_groups, missing_tables
 
 # === CSV writers ===
+# pandas' C serializer formats the whole table in one call instead of a
+# Python-level loop per row — the missing-days report can run to hundreds
+# of instruments × years of days
 def write_csv(filename, header, rows):
-    with open(filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(header)
-        writer.writerows(rows)
-
-def write_grouped_csv(filename, grouped_data):
-    with open(filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["Instrument", "Missing Day Groups"])
-        for instrument, dates in grouped_data.items():
-            writer.writerow([instrument, dates])
-
-def write_missing_day_summary(filename, grouped_data):
-    total_missing = 0
-    rows = []
-    for instrument, dates in grouped_data.items():
-        count = len(dates)
-        total_missing += count
-        rows.append([instrument, count])
-    rows.append(["TOTAL", total_missing])
-    with open(filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["Instrument", "Missing Day Count"])
-        writer.writerows(rows)
-
-# === Group missing day groups by instrument ===
-def group_missing_days(missing_groups):
-    grouped = defaultdict(list)
-    for instrument, date_str in missing_groups:
-        grouped[instrument].append(date_str)
-    return grouped
+    pd.DataFrame(rows, columns=header).to_csv(filename, index=False)
+
+def write_missing_day_summary(filename, missing_counts):
+    rows = [[instrument, count] for instrument, count in missing_counts.items()]
+    rows.append(["TOTAL", sum(missing_counts.values())])
+    write_csv(filename, ["Instrument", "Missing Day Count"], rows)
 
 # === Worker wrapper ===
 def process_file(args):
-    filename, folder_path, start_date, end_date = args
+    filename, folder_path, start_date, end_date, instruments = args
     file_path = os.path.join(folder_path, filename)
     try:
-        print(f"🔍 Scanning {filename}...")
-        last_rows, group_rows, table_rows = scan_hdf5(file_path, start_date, end_date)
+        print(f"🔍 Scanning {filename} ({len(instruments)} instruments)...")
+        last_rows, group_rows, table_rows = scan_hdf5(
+            file_path, start_date, end_date, instruments)
         print(f"✅ {filename}: {len(last_rows)} updates, {len(group_rows)} missing groups, {len(table_rows)} missing tables")
         return last_rows, group_rows, table_rows
     except Exception as e:
@@ -129,28 +190,63 @@ def main():
     missing_table_csv = "missing_table.csv"
     missing_day_summary_csv = "missing_day_summary.csv"
 
-    h5_files = [f for f in os.listdir(folder_path) if f.lower().endswith(".h5")]
+    # scandir's DirEntry carries the file type from the directory read
+    # itself, so no stat() per entry
+    with os.scandir(folder_path) as entries:
+        h5_files = [e.name for e in entries
+                    if e.is_file() and e.name.lower().endswith(".h5")]
     print(f"📁 Found {len(h5_files)} HDF5 files in {folder_path}")
 
-    all_last_updates = []
-    all_missing_groups = []
-    all_missing_tables = []
+    # Enumerate each file's instruments up front — listing root keys only
+    # reads the file header — and dispatch disjoint instrument chunks as
+    # the work units. A file holding many instruments then spreads across
+    # workers instead of being pinned to the one that drew its filename,
+    # and no two workers re-walk the same subtree.
+    tasks = []
+    for filename in h5_files:
+        try:
+            with h5py.File(os.path.join(folder_path, filename), "r") as f:
+                instruments = list(f.keys())
+        except Exception as e:
+            print(f"❌ Error opening {filename}: {e}")
+            continue
+        for i in range(0, len(instruments), 8):
+            tasks.append((filename, folder_path, start_date, end_date,
+                          instruments[i:i + 8]))
 
-    with ProcessPoolExecutor(max_workers=28) as executor:
-        tasks = [(f, folder_path, start_date, end_date) for f in h5_files]
-        futures = [executor.submit(process_file, task) for task in tasks]
+    # Per-instrument missing-day counts are all the summary needs — no
+    # reason to hold every (instrument, date) row in the parent for it
+    missing_counts = defaultdict(int)
 
+    # The scan is metadata/I/O-bound and h5py releases its lock during
+    # reads, so threads parallelize it as well as processes did — without
+    # fork/pickle overhead per file and with one shared page cache.
+    # Each future's rows stream straight into the open CSVs as they
+    # arrive (still batched through the C serializer), so parent memory
+    # stays O(instruments) instead of O(total missing days).
+    # missing_group_csv keeps its long format, one (instrument, date)
+    # per row, so patch.py/parallel_patch.py can parse it with one
+    # pd.read_csv(parse_dates=['date']) call.
+    with ThreadPoolExecutor(max_workers=28) as executor, \
+            open(last_update_csv, "w", newline="", encoding="utf-8") as last_f, \
+            open(missing_group_csv, "w", newline="", encoding="utf-8") as group_f, \
+            open(missing_table_csv, "w", newline="", encoding="utf-8") as table_f:
+        sinks = [(last_f, ["Instrument", "Last Good Date"]),
+                 (group_f, ["instrument", "date"]),
+                 (table_f, ["Instrument", "Missing Table Dataset"])]
+        for sink, header in sinks:
+            pd.DataFrame(columns=header).to_csv(sink, index=False)
+
+        futures = [executor.submit(process_file, task) for task in tasks]
         for future in as_completed(futures):
-            last_rows, group_rows, table_rows = future.result()
-            all_last_updates.extend(last_rows)
-            all_missing_groups.extend(group_rows)
-            all_missing_tables.extend(table_rows)
-
-    write_csv(last_update_csv, ["Instrument", "Last Good Date"], all_last_updates)
-    grouped_missing = group_missing_days(all_missing_groups)
-    write_grouped_csv(missing_group_csv, grouped_missing)
-    write_missing_day_summary(missing_day_summary_csv, grouped_missing)
-    write_csv(missing_table_csv, ["Instrument", "Missing Table Dataset"], all_missing_tables)
+            results = future.result()
+            for (sink, _), rows in zip(sinks, results):
+                if rows:
+                    pd.DataFrame(rows).to_csv(sink, index=False, header=False)
+            for instrument, _ in results[1]:
+                missing_counts[instrument] += 1
+
+    write_missing_day_summary(missing_day_summary_csv, missing_counts)
 
     print("🏁 Scan completed.")
     print(f"→ Last tick updates saved to: {last_update_csv}")
@@ -1,14 +1,34 @@
 import logging
 import MetaTrader5 as mt5
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import reduce
 from .data_fetcher import fetch_closes
 
 
-def get_fx_series(pair, cached_symbols, bars, timeframe):
+def get_fx_series(pair, cached_symbols, bars, timeframe, fx_cache=None):
     """
     Ensure pair is in MarketWatch (cached_symbols is a set of symbol names).
     Then fetch closes via fetch_closes and return a pandas Series (or None).
+    fx_cache, when given, memoizes the resulting series (and failures) per pair
+    so each FX rate is resolved once per panel build.
     """
+    if fx_cache is not None and pair in fx_cache:
+        return fx_cache[pair]
+
+    fx_series = _fetch_fx_series(pair, cached_symbols, bars, timeframe)
+    if fx_cache is not None:
+        fx_cache[pair] = fx_series
+    return fx_series
+
+
+# Remembers symbol_select outcomes across panel builds so pairs the broker
+# doesn't offer are probed once per process, not once per run/symbol.
+_PAIR_AVAILABILITY = {}
+
+
+def _fetch_fx_series(pair, cached_symbols, bars, timeframe):
     # Ensure type: cached_symbols must be a set (not dict)
     if not isinstance(cached_symbols, set):
         logging.warning("cached_symbols is not a set; converting to set locally for safety.")
@@ -16,10 +36,14 @@ def get_fx_series(pair, cached_symbols, bars, timeframe):
 
     # Try to ensure the symbol is available at broker/marketwatch
     if pair not in cached_symbols:
-        added = mt5.symbol_select(pair, True)
-        if added:
+        available = _PAIR_AVAILABILITY.get(pair)
+        if available is None:
+            available = bool(mt5.symbol_select(pair, True))
+            _PAIR_AVAILABILITY[pair] = available
+            if available:
+                logging.info(f"📈 Auto-added missing FX pair {pair} to MarketWatch.")
+        if available:
             cached_symbols.add(pair)
-            logging.info(f"📈 Auto-added missing FX pair {pair} to MarketWatch.")
         else:
             logging.debug(f"FX pair {pair} not available in broker symbol list.")
             return None
@@ -42,44 +66,98 @@ def get_fx_series(pair, cached_symbols, bars, timeframe):
     return fx_series
 
 
-def convert_series_to_usd(symbol_close, symbol_name, symbol_info, cached_symbols, bars, timeframe):
+def _apply_fx(symbol_close, fx_series, invert=False):
     """
-    Convert any symbol (FX, index, commodity) into USD terms using MT5 contract info.
+    Multiply (or divide) a close series by an FX series on their shared
+    timestamps. Intersecting the indexes explicitly and doing the arithmetic
+    on ndarrays skips pandas' union alignment, which would reindex both
+    operands and introduce NaN rows for non-overlapping bars.
+    """
+    common = symbol_close.index.intersection(fx_series.index)
+    a = symbol_close.loc[common].to_numpy()
+    b = fx_series.loc[common].to_numpy()
+    usd = a / b if invert else a * b
+    return pd.Series(usd, index=common, name=symbol_close.name)
 
-    - cached_symbols is expected to be a set of symbol names already added to MarketWatch.
-    - This function will call get_fx_series(...) to fetch required FX rates.
+
+# Classification per symbol is a cascade of getattr + path substring checks;
+# contract info is static for a session, so resolve it once per process.
+_CLASS_CACHE = {}
+
+
+def _classify_symbol(symbol_name, symbol_info):
+    """Classify a symbol once from its MT5 contract info.
+
+    Returns one of "usd_quote", "index", "commodity", "fx_usd_base",
+    "fx_usd_quote", "fx_cross" or "other". Checks mirror the original
+    cascade order: USD quote first, then index, commodity, FX.
     """
+    cls = _CLASS_CACHE.get(symbol_name)
+    if cls is not None:
+        return cls
+
     base = getattr(symbol_info, "currency_base", None)
     quote = getattr(symbol_info, "currency_profit", None)
     path = getattr(symbol_info, "path", "") or ""
     sym_type = getattr(symbol_info, "type", None)  # note: MT5 uses .type in many bindings
 
-    logging.info(f"Converting {symbol_name:<10} | Base={base} | Quote={quote} | Path={path} | Type={sym_type}")
+    try:
+        if quote == "USD":
+            cls = "usd_quote"
+        elif (path and ("Index" in path or "Indices" in path)) or (
+                sym_type is not None
+                and sym_type == getattr(mt5, "SYMBOL_TYPE_INDEX", sym_type)):
+            cls = "index"
+        elif (path and ("Metal" in path or "Metals" in path
+                        or "Commodity" in path or "Commodities" in path)) or (
+                sym_type is not None
+                and sym_type == getattr(mt5, "SYMBOL_TYPE_COMMODITY", -1)):
+            cls = "commodity"
+        elif ("Forex" in path) or (
+                sym_type is not None
+                and sym_type == getattr(mt5, "SYMBOL_TYPE_FOREX", sym_type)):
+            if base == "USD":
+                cls = "fx_usd_base"
+            elif quote == "USD":
+                cls = "fx_usd_quote"
+            else:
+                cls = "fx_cross"
+        else:
+            cls = "other"
+    except Exception:
+        # defensive: any error here -> don't crash, fall through to "other"
+        cls = "other"
+
+    _CLASS_CACHE[symbol_name] = cls
+    return cls
+
+
+def convert_series_to_usd(symbol_close, symbol_name, symbol_info, cached_symbols, bars, timeframe, fx_cache=None):
+    """
+    Convert any symbol (FX, index, commodity) into USD terms using MT5 contract info.
+
+    - cached_symbols is expected to be a set of symbol names already added to MarketWatch.
+    - This function will call get_fx_series(...) to fetch required FX rates.
+    """
+    base = getattr(symbol_info, "currency_base", None)
+    quote = getattr(symbol_info, "currency_profit", None)
 
     # Quick sanity for incoming series
     if symbol_close is None or (hasattr(symbol_close, "empty") and symbol_close.empty):
         logging.warning(f"No price data provided for {symbol_name}.")
         return None
 
-    # 1) If already quoted in USD -> leave as is
-    if quote == "USD":
+    cls = _classify_symbol(symbol_name, symbol_info)
+    logging.info(f"Converting {symbol_name:<10} | Base={base} | Quote={quote} | Class={cls}")
+
+    # 1) Already quoted in USD -> leave as is (covers USD-quoted FX too)
+    if cls in ("usd_quote", "fx_usd_quote"):
         logging.debug(f"{symbol_name} already quoted in USD -> no conversion.")
         logging.debug(f"sample: {symbol_close.head()}")
         return symbol_close
 
-    # 2) Indices: handle first (use path or type if available)
-    # Use path string search OR symbol type constant if available
-    is_index = False
-    try:
-        if path and ("Index" in path or "Indices" in path):
-            is_index = True
-        elif sym_type is not None and sym_type == getattr(mt5, "SYMBOL_TYPE_INDEX", sym_type):
-            is_index = True
-    except Exception:
-        # defensive: any error here -> don't crash, continue
-        is_index = False
-
-    if is_index:
+    # 2) Indices: convert via the quote currency's USD rate
+    if cls == "index":
         logging.info(f"Detected Index: {symbol_name} quoted in {quote}. Converting to USD.")
 
         # Prefer direct local->USD pair (e.g., CHFUSD), else try USDlocal (USDCHF)
@@ -87,20 +165,20 @@ def convert_series_to_usd(symbol_close, symbol_name, symbol_info, cached_symbols
         fx_inverse = f"USD{quote}"  # USDCHF
 
         # Try direct
-        fx_series = get_fx_series(fx_direct, cached_symbols, bars, timeframe)
+        fx_series = get_fx_series(fx_direct, cached_symbols, bars, timeframe, fx_cache)
         if fx_series is not None:
             logging.info(f"{symbol_name}: converting via {fx_direct} (multiply by {fx_direct}).")
-            converted = symbol_close * fx_series
+            converted = _apply_fx(symbol_close, fx_series)
             logging.debug(f"index head:\n{symbol_close.head()}")
             logging.debug(f"fx head ({fx_direct}):\n{fx_series.head()}")
             logging.debug(f"converted head:\n{converted.head()}")
             return converted
 
         # Try inverse
-        fx_series = get_fx_series(fx_inverse, cached_symbols, bars, timeframe)
+        fx_series = get_fx_series(fx_inverse, cached_symbols, bars, timeframe, fx_cache)
         if fx_series is not None:
             logging.info(f"{symbol_name}: converting via inverted {fx_inverse} (divide by {fx_inverse}).")
-            converted = symbol_close / fx_series
+            converted = _apply_fx(symbol_close, fx_series, invert=True)
             logging.debug(f"index head:\n{symbol_close.head()}")
             logging.debug(f"fx head ({fx_inverse}):\n{fx_series.head()}")
             logging.debug(f"converted head:\n{converted.head()}")
@@ -110,62 +188,92 @@ def convert_series_to_usd(symbol_close, symbol_name, symbol_info, cached_symbols
         return None
 
     # 3) Commodities - leave as is
-    is_commodity = False
-    try:
-        if path and ("Metal" in path or "Metals" in path or "Commodity" in path or "Commodities" in path):
-            is_commodity = True
-        elif sym_type is not None and sym_type == getattr(mt5, "SYMBOL_TYPE_COMMODITY", -1):
-            is_commodity = True
-    except Exception:
-        is_commodity = False
-
-    if is_commodity:
+    if cls == "commodity":
         logging.debug(f"{symbol_name} detected as commodity -> left as is.")
         logging.debug(f"sample: {symbol_close.head()}")
         return symbol_close
 
-    # 4) FX detection (after filtering indices/commodities)
-    is_fx = False
-    try:
-        if path and "Forex" in path:
-            is_fx = True
-        elif sym_type is not None and sym_type == getattr(mt5, "SYMBOL_TYPE_FOREX", sym_type):
-            is_fx = True
-        else:
-            # conservative: only mark as FX if both base and quote look like currency codes
-            if base and quote and len(str(base)) == 3 and len(str(quote)) == 3:
-                # But prefer path/type; set False unless path hinted Forex
-                is_fx = ("Forex" in path)
-    except Exception:
-        is_fx = False
-
-    if is_fx:
-        logging.debug(f"{symbol_name} treated as FX pair.")
-
-        # FX pairs starting with USD -> invert (USDxxx -> 1 / USDxxx)
-        if base == "USD":
-            logging.debug(f"{symbol_name} starts with USD -> inverting.")
-            fx_series = get_fx_series(f"{base}{quote}", cached_symbols, bars, timeframe)
-            if fx_series is not None:
-                converted = 1 / fx_series
-                logging.debug(f"sample fx:\n{fx_series.head()}")
-                logging.debug(f"sample inverted:\n{converted.head()}")
-                return converted
-            logging.warning(f"⚠ FX pair {base}{quote} not available for inversion.")
-            return None
-
-        # FX pairs ending with USD -> already USD quoted
-        if quote == "USD":
-            logging.debug(f"{symbol_name} ends with USD -> left as is.")
-            logging.debug(f"sample: {symbol_close.head()}")
-            return symbol_close
-
-        # Cross pair -> leave as is (per strict rules)
-        logging.debug(f"{symbol_name} is a cross pair -> left as is.")
-        logging.debug(f"sample: {symbol_close.head()}")
-        return symbol_close
+    # 4) FX pairs starting with USD -> invert (USDxxx -> 1 / USDxxx)
+    if cls == "fx_usd_base":
+        logging.debug(f"{symbol_name} starts with USD -> inverting.")
+        fx_series = get_fx_series(f"{base}{quote}", cached_symbols, bars, timeframe, fx_cache)
+        if fx_series is not None:
+            converted = 1 / fx_series
+            logging.debug(f"sample fx:\n{fx_series.head()}")
+            logging.debug(f"sample inverted:\n{converted.head()}")
+            return converted
+        logging.warning(f"⚠ FX pair {base}{quote} not available for inversion.")
+        return None
 
-    # 5) Everything else -> leave as is
-    logging.debug(f"No rule matched for {symbol_name} -> left as is.")
+    # 5) Cross pairs and everything else -> leave as is (per strict rules)
+    logging.debug(f"{symbol_name} classified as {cls} -> left as is.")
     logging.debug(f"sample: {symbol_close.head()}")
     return symbol_close
+
+
+def build_usd_price_panel(symbols, cached_symbols, bars, timeframe):
+    """
+    Fetch closes for all symbols and convert them into one USD price panel.
+
+    Two passes:
+    1. Collect raw close series and symbol info for every symbol.
+    2. Convert each series to USD, sharing a single fx_cache so every FX
+       rate is resolved once per panel build instead of once per symbol.
+
+    Returns an inner-joined DataFrame (columns = symbols) or None.
+    """
+    def fetch_one(sym):
+        data = fetch_closes(sym, bars, timeframe)
+        if data is None or data.empty:
+            return sym, None, None
+        return sym, data, mt5.symbol_info(sym)
+
+    # Fetching waits on terminal IPC, so thread it out (same idiom as
+    # batch_update.py's ThreadPoolExecutor fetch loop).
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(16, max(1, len(symbols)))) as executor:
+        futures = [executor.submit(fetch_one, sym) for sym in symbols]
+        for future in as_completed(futures):
+            sym, data, info = future.result()
+            results[sym] = (data, info)
+
+    raw_closes = {}
+    infos = {}
+    for sym in symbols:  # keep Market Watch order deterministic
+        data, info = results[sym]
+        if data is None:
+            logging.warning("No price data for %s, skipping.", sym)
+            continue
+
+        if info is None:
+            logging.warning("No symbol info for %s, skipping.", sym)
+            continue
+
+        raw_closes[sym] = data
+        infos[sym] = info
+
+    fx_cache = {}
+    usd_panel = {}
+    for sym, data in raw_closes.items():
+        usd_series = convert_series_to_usd(
+            symbol_close=data,
+            symbol_name=sym,
+            symbol_info=infos[sym],
+            cached_symbols=cached_symbols,
+            bars=bars,
+            timeframe=timeframe,
+            fx_cache=fx_cache
+        )
+        if usd_series is not None and not usd_series.empty:
+            usd_panel[sym] = usd_series
+
+    if not usd_panel:
+        return None
+
+    # Intersect the indexes once and stack reindexed values — concat's
+    # inner join reindexes every series against a running union first
+    common_idx = reduce(lambda a, b: a.intersection(b),
+                        (s.index for s in usd_panel.values()))
+    matrix = np.column_stack([s.reindex(common_idx, copy=False).to_numpy()
+                              for s in usd_panel.values()])
+    return pd.DataFrame(matrix, index=common_idx, columns=list(usd_panel))
@@ -13,15 +13,22 @@ Features:
 
 from __future__ import annotations
 import MetaTrader5 as mt5
+import numpy as np
 import pandas as pd
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import reduce
 from threading import Lock
 from typing import Iterable, Optional, Dict
 
 # Simple in-memory cache (process-lifetime). Stores pd.Series (closes) or None for failed fetch.
+# Entries are write-once: once a symbol's series (or failure marker) is in,
+# it is never replaced or mutated. Cached series are shared, not copied —
+# callers treat close series as read-only.
 _FETCH_CACHE: Dict[str, Optional[pd.Series]] = {}
-_CACHE_LOCK = Lock()
+_CACHE_LOCK = Lock()  # taken for inserts only; reads are lock-free
+_MISS = object()  # distinguishes "not cached" from a cached failed fetch (None)
 
 
 def _normalize_symbol(sym: str) -> str:
@@ -31,19 +38,18 @@ def _normalize_symbol(sym: str) -> str:
     return sym.strip().upper()
 
 
-def ensure_history(symbol: str, timeframe, bars: int) -> bool:
-    """Ensure MT5 server has enough historical data for the symbol."""
-    try:
-        mt5.symbol_select(symbol, True)
-        preload = mt5.copy_rates_from_pos(symbol, timeframe, 0, bars * 2)
-    except Exception as e:  # keep MT5 exceptions from crashing caller
-        logging.warning(f"[HISTORY] Exception preloading {symbol}: {e}")
-        return False
+def warm_symbols(symbols: Iterable[str]) -> None:
+    """Add symbols to MarketWatch in one sweep before any rates are fetched.
 
-    if preload is None or len(preload) == 0:
-        logging.warning(f"[HISTORY] Unable to preload {symbol}")
-        return False
-    return True
+    symbol_select is a cheap local call; doing them all up front means MT5
+    starts preloading history for the whole basket while the first
+    copy_rates_from_pos is still in flight.
+    """
+    for sym in symbols:
+        try:
+            mt5.symbol_select(sym, True)
+        except Exception as e:  # keep MT5 exceptions from crashing caller
+            logging.warning(f"[WARM] Exception selecting {sym}: {e}")
 
 
 def fetch_closes(symbol: str, bars: int, timeframe, lookback_days: Optional[int] = None) -> Optional[pd.Series]:
@@ -54,16 +60,17 @@ def fetch_closes(symbol: str, bars: int, timeframe, lookback_days: Optional[int]
     """
     norm = _normalize_symbol(symbol)
 
-    # First check cache under lock
-    with _CACHE_LOCK:
-        if norm in _FETCH_CACHE:
-            cached = _FETCH_CACHE[norm]
-            if cached is None:
-                logging.info(f"[CACHE-HIT] {symbol} previously failed; skipping.")
-                return None
-            # Return a copy to avoid outside mutation of cached object
-            logging.info(f"[CACHE-HIT] Using cached data for {symbol}")
-            return cached.copy()
+    # Lock-free hit path: a single dict.get is atomic under the GIL and
+    # entries are write-once, so the lock would only serialize readers.
+    # At worst a racing miss refetches one symbol and overwrites the entry
+    # with identical data.
+    cached = _FETCH_CACHE.get(norm, _MISS)
+    if cached is not _MISS:
+        if cached is None:
+            logging.info(f"[CACHE-HIT] {symbol} previously failed; skipping.")
+            return None
+        logging.info(f"[CACHE-HIT] Using cached data for {symbol}")
+        return cached
 
     # Resolve timeframe constant
     timeframe_const = getattr(mt5, timeframe, timeframe) if isinstance(timeframe, str) else timeframe
@@ -73,14 +80,12 @@ def fetch_closes(symbol: str, bars: int, timeframe, lookback_days: Optional[int]
             _FETCH_CACHE[norm] = None
         return None
 
-    # Ensure history loaded
-    if not ensure_history(symbol, timeframe_const, bars):
-        with _CACHE_LOCK:
-            _FETCH_CACHE[norm] = None
-        return None
-
-    # Fetch rates
+    # One RPC per symbol: symbol_select is cheap/local and MT5 preloads
+    # history on demand, so the old ensure_history preload (a second
+    # copy_rates_from_pos for bars*2) doubled the round-trips for nothing —
+    # an empty result below already covers the unavailable-history case.
     try:
+        mt5.symbol_select(symbol, True)
         rates = mt5.copy_rates_from_pos(symbol, timeframe_const, 0, bars)
     except Exception as e:
         logging.warning(f"[FETCH] Exception fetching {symbol}: {e}")
@@ -94,26 +99,32 @@ def fetch_closes(symbol: str, bars: int, timeframe, lookback_days: Optional[int]
             _FETCH_CACHE[norm] = None
         return None
 
-    # Convert to DataFrame and clean
-    df = pd.DataFrame(rates)
-    if 'time' not in df.columns:
+    # Build the close series straight from the MT5 structured array — no
+    # intermediate DataFrame, and only the two fields we need are touched.
+    fields = rates.dtype.names or ()
+    if 'time' not in fields or 'close' not in fields:
         logging.warning(f"[FETCH] Unexpected data format for {symbol}")
         with _CACHE_LOCK:
             _FETCH_CACHE[norm] = None
         return None
 
-    df['time'] = pd.to_datetime(df['time'], unit='s')
-    df.set_index('time', inplace=True)
-    df = df[~df.index.duplicated(keep='last')]
-    df = df[df.index <= datetime.now()]
-
-    if 'close' not in df.columns:
-        logging.warning(f"[FETCH] No 'close' column for {symbol}")
-        with _CACHE_LOCK:
-            _FETCH_CACHE[norm] = None
-        return None
-
-    closes = df['close'].rename(symbol)
+    # Dedupe and filter on the raw arrays before any pandas object exists:
+    # epoch seconds cast straight to datetime64, np.unique on the reversed
+    # times yields last-occurrence indices for duplicated bars, and the
+    # not-in-the-future check is one datetime64 comparison.
+    times = rates['time'].astype('datetime64[s]')
+    values = rates['close']
+    if len(times) > 1:
+        _, rev_idx = np.unique(times[::-1], return_index=True)
+        keep = len(times) - 1 - rev_idx
+        times = times[keep]
+        values = values[keep]
+    mask = times <= np.datetime64(datetime.now())
+    if not mask.all():
+        times = times[mask]
+        values = values[mask]
+
+    closes = pd.Series(values, index=pd.DatetimeIndex(times), name=symbol, copy=False)
     actual_bars = len(closes)
 
     # Check completeness
@@ -125,11 +136,12 @@ def fetch_closes(symbol: str, bars: int, timeframe, lookback_days: Optional[int]
 
     logging.info(f"[OK] {symbol} fetched successfully ({actual_bars} bars)")
 
-    # Cache the result (store a copy to be safe)
+    # Cache and return the same object: close series are read-only by
+    # contract, so the two defensive copies per fetch are unnecessary
     with _CACHE_LOCK:
-        _FETCH_CACHE[norm] = closes.copy()
+        _FETCH_CACHE[norm] = closes
 
-    return closes.copy()
+    return closes
 
 
 def fetch_multiple(symbols: Iterable[str], bars: int, timeframe, lookback_days: int) -> Optional[pd.DataFrame]:
@@ -149,10 +161,26 @@ def fetch_multiple(symbols: Iterable[str], bars: int, timeframe, lookback_days:
         else:
             logging.info(f"[SKIP] Duplicate input symbol (normalized) skipped: {sym} -> {norm_to_original[norm]}")
 
+    # Warm the whole basket in one sweep so each worker's fetch below is a
+    # single copy_rates_from_pos RPC
+    warm_symbols(norm_to_original.values())
+
+    # Each fetch waits on terminal IPC, so thread them out (same idiom as
+    # build_usd_price_panel); the cache is already lock-protected.
+    results: Dict[str, Optional[pd.Series]] = {}
+    with ThreadPoolExecutor(max_workers=min(16, max(1, len(norm_to_original)))) as executor:
+        futures = {
+            executor.submit(fetch_closes, original_sym, bars, timeframe, lookback_days): original_sym
+            for original_sym in norm_to_original.values()
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
     valid_series: Dict[str, pd.Series] = {}
 
-    for norm, original_sym in norm_to_original.items():
-        closes = fetch_closes(original_sym, bars, timeframe, lookback_days)
+    # Rebuild in input order so column order stays deterministic
+    for original_sym in norm_to_original.values():
+        closes = results[original_sym]
         if closes is None:
             logging.warning(f"[SKIP] {original_sym} excluded (no / incomplete data).")
             continue
@@ -166,8 +194,15 @@ def fetch_multiple(symbols: Iterable[str], bars: int, timeframe, lookback_days:
         logging.error("[RESULT] No valid symbols fetched.")
         return None
 
-    # Align by inner join: only keep timestamps common to all series
-    df = pd.DataFrame(valid_series).dropna(how='any')  # inner join behavior
+    # Align by inner join: intersect the indexes first, then stack the
+    # reindexed values into one matrix. The old DataFrame-then-dropna path
+    # materialized the full timestamp union (3-5x the intersection when
+    # symbols keep different trading hours) only to discard most rows.
+    common_idx = reduce(lambda a, b: a.intersection(b),
+                        (s.index for s in valid_series.values()))
+    matrix = np.column_stack([s.reindex(common_idx, copy=False).to_numpy()
+                              for s in valid_series.values()])
+    df = pd.DataFrame(matrix, index=common_idx, columns=list(valid_series))
 
     if df.empty:
         logging.warning("[ALIGN] No overlapping timestamps across valid symbols. Returning original per-series data as separate columns where possible.")
@@ -182,11 +217,9 @@ def fetch_multiple(symbols: Iterable[str], bars: int, timeframe, lookback_days:
             return None
         return df_outer
 
-    # Final completeness check (after alignment)
-    final_cols = [c for c in df.columns if len(df[c].dropna()) >= lookback_days]
-    df = df[final_cols]
-
-    if df.empty:
+    # Final completeness check (after alignment) — the intersection leaves
+    # every column with the same NaN-free length, so one row count covers all
+    if lookback_days is not None and len(df) < lookback_days:
         logging.error("[RESULT] No columns remain after final completeness check.")
         return None
 
@@ -1,18 +1,27 @@
 """
 io_utils.py
 -----------
-Handles Excel output and formatted results for portfolio data.
+Handles Excel/Parquet output and formatted results for portfolio data.
 """
 
+import os
 import pandas as pd
 import logging
 
 def save_results(filename, price_panel, returns, mu, cov, results):
-    """Save all outputs into Excel."""
+    """Save all outputs.
+
+    The bulky frames (prices, returns, covariance) go to Parquet — openpyxl
+    serializes cell-by-cell and dominates runtime once the panel grows past a
+    few symbols. Excel keeps only the small summary sheets consumers open by
+    hand.
+    """
+    stem = os.path.splitext(filename)[0]
+    price_panel.to_parquet(f"{stem}_usd_prices.parquet")
+    returns.to_parquet(f"{stem}_log_returns.parquet")
+    cov.to_parquet(f"{stem}_cov_annual.parquet")
+
     with pd.ExcelWriter(filename) as writer:
-        price_panel.to_excel(writer, sheet_name='USD_Prices')
-        returns.to_excel(writer, sheet_name='Log_Returns')
         mu.to_frame('mu_annual').to_excel(writer, sheet_name='Mu_Annual')
-        cov.to_excel(writer, sheet_name='Cov_Annual')
         results.to_excel(writer, sheet_name='MaxSharpe_Portfolio')
-    logging.info("Results saved to %s", filename)
+    logging.info("Results saved to %s (bulk panels in %s_*.parquet)", filename, stem)
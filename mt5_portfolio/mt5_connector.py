@@ -18,7 +18,9 @@ def shutdown_mt5():
 
 def get_marketwatch_symbols():
     """Return all visible symbols in Market Watch."""
+    # symbols_get() already carries .visible on each entry — probing
+    # mt5.symbol_info per symbol would double the terminal round-trips.
     all_symbols = mt5.symbols_get()
-    symbols = [s.name for s in all_symbols if getattr(mt5.symbol_info(s.name), "visible", True)]
+    symbols = [s.name for s in all_symbols if getattr(s, "visible", False)]
     logging.info("Found %d symbols in Market Watch.", len(symbols))
-    return sorted(list(set(symbols)))
+    return sorted(symbols)
@@ -7,6 +7,8 @@ Consistent with annualized statistics from portfolio_math.py.
 
 import numpy as np
 import pandas as pd
+from scipy.linalg import cho_factor, cho_solve
+from scipy.linalg.blas import dsymv
 from scipy.optimize import minimize
 import matplotlib
 import matplotlib.pyplot as plt
@@ -21,6 +23,13 @@ try:
 except Exception:
     matplotlib.use("Agg")
 
+# cvxpy is optional: when present, max-Sharpe is solved as a convex QP
+# (globally optimal); otherwise we fall back to SciPy SLSQP.
+try:
+    import cvxpy as cp
+except ImportError:
+    cp = None
+
 
 # -------------------------------------------------------------------------
 # 🔧 Helper: Portfolio statistics
@@ -31,12 +40,16 @@ def portfolio_stats(weights, mu, cov, risk_free):
 
     All inputs are assumed to be ANNUALIZED (consistent units).
     """
-    weights = np.asarray(weights)
-    mu = np.asarray(mu)
-    cov = np.asarray(cov)
+    weights = np.asarray(weights, dtype=float)
+    mu = np.asarray(mu, dtype=float)
+    # dsymv wants Fortran order or it copies per call; callers that loop
+    # (the frontier sweep) pass an already-Fortran cov so this is a no-op
+    cov = np.asfortranarray(cov, dtype=float)
 
-    port_ret = np.dot(weights, mu)
-    port_vol = np.sqrt(np.dot(weights, np.dot(cov, weights)))
+    port_ret = weights @ mu
+    # Symmetric BLAS matvec reads one triangle of Σ — half the memory
+    # traffic of the general np.dot(cov, weights)
+    port_vol = np.sqrt(weights @ dsymv(1.0, cov, weights))
     sharpe = (port_ret - risk_free) / port_vol
     return port_ret, port_vol, sharpe
 
@@ -45,25 +58,114 @@ def portfolio_stats(weights, mu, cov, risk_free):
 # 1️⃣ Max Sharpe Portfolio
 # -------------------------------------------------------------------------
 def max_sharpe_portfolio(mu, cov, risk_free=0.02, allow_shorts=False):
-    """Optimize portfolio for maximum Sharpe ratio."""
-    mu_arr = np.asarray(mu)
-    cov_arr = np.asarray(cov)
+    """Optimize portfolio for maximum Sharpe ratio.
+
+    Prefers the Schaible transformation (convex QP, globally optimal) when
+    cvxpy is installed; otherwise uses SciPy SLSQP on the ratio objective.
+    """
+    mu_arr = np.asarray(mu, dtype=float)
+    cov_arr = np.asarray(cov, dtype=float)
+    # symmetrize against numeric noise; Fortran order so the BLAS calls
+    # downstream take it without copying
+    cov_arr = np.asfortranarray(0.5 * (cov_arr + cov_arr.T))
+
+    w = _max_sharpe_qp(mu_arr, cov_arr, risk_free, allow_shorts) if cp is not None else None
+    if w is None:
+        w = _max_sharpe_slsqp(mu_arr, cov_arr, risk_free, allow_shorts)
+
+    port_ret, port_vol, sharpe = portfolio_stats(w, mu_arr, cov_arr, risk_free)
+    return pd.Series(w, index=mu.index), port_ret, port_vol, sharpe
+
+
+def _max_sharpe_qp(mu_arr, cov_arr, risk_free, allow_shorts):
+    """Schaible transform: max Sharpe == min yᵀΣy s.t. (μ-rf)ᵀy = 1, Σyᵢ = k ≥ 0."""
+    n = len(mu_arr)
+    y = cp.Variable(n)
+    k = cp.Variable()
+
+    constraints = [(mu_arr - risk_free) @ y == 1, cp.sum(y) == k, k >= 0]
+    if allow_shorts:
+        # Homogenized (-1, 1) box: w = y/k, so |wᵢ| ≤ 1 ⇔ -k ≤ yᵢ ≤ k —
+        # keeps this path consistent with the SLSQP bounds
+        constraints += [y <= k, y >= -k]
+    else:
+        # y ≥ 0 with Σyᵢ = k already implies yᵢ ≤ k, i.e. 0 ≤ wᵢ ≤ 1
+        constraints.append(y >= 0)
+
+    prob = cp.Problem(cp.Minimize(cp.quad_form(y, cp.psd_wrap(cov_arr))), constraints)
+    try:
+        prob.solve()
+    except cp.error.SolverError as e:
+        logging.warning("Max-Sharpe QP solve failed (%s); falling back to SLSQP.", e)
+        return None
+
+    if y.value is None or k.value is None or k.value <= 0:
+        logging.warning("Max-Sharpe QP infeasible (no asset beats risk-free?); falling back to SLSQP.")
+        return None
+
+    return y.value / k.value
+
+
+def _tangency_weights(mu_arr, cov_arr, risk_free):
+    """Closed-form unconstrained tangency portfolio: w ∝ Σ⁻¹(μ - rf).
+
+    Returns None when Σ is not positive definite or the excess-return
+    vector sums the solution to ~0 (no asset beats risk-free).
+    """
+    n = len(mu_arr)
+    excess = mu_arr - risk_free
+    try:
+        w = cho_solve(cho_factor(cov_arr + 1e-10 * np.eye(n)), excess)
+    except np.linalg.LinAlgError:
+        return None
+    total = w.sum()
+    if abs(total) < 1e-12:
+        return None
+    return w / total
+
+
+def _max_sharpe_slsqp(mu_arr, cov_arr, risk_free, allow_shorts):
     n = len(mu_arr)
 
-    def neg_sharpe(w):
-        return -portfolio_stats(w, mu_arr, cov_arr, risk_free)[2]
+    # With shorts allowed, the only binding constraint is Σwᵢ = 1 and the
+    # tangency portfolio is one Cholesky solve — no iterating at all. Fall
+    # through to SLSQP only when the closed form leaves the (-1, 1) box.
+    w_tan = _tangency_weights(mu_arr, cov_arr, risk_free)
+    if allow_shorts and w_tan is not None and np.all(np.abs(w_tan) <= 1):
+        return w_tan
+
+    # Factor Σ = L·Lᵀ once: each objective evaluation then needs a single
+    # triangular multiply, and the analytic gradient reuses Lᵀw, so SLSQP
+    # skips its O(n) finite-difference sweep per iteration.
+    L = np.linalg.cholesky(cov_arr + 1e-10 * np.eye(n))
+
+    def neg_sharpe_and_grad(w):
+        Lt_w = L.T @ w
+        vol = np.sqrt(max(Lt_w @ Lt_w, 1e-12))
+        excess = mu_arr @ w - risk_free
+        # d/dw [excess/vol] = mu/vol - excess·(Σw)/vol³, with Σw = L·(Lᵀw)
+        grad = mu_arr / vol - excess * (L @ Lt_w) / vol ** 3
+        return -excess / vol, -grad
 
     bounds = [(-1, 1) if allow_shorts else (0, 1)] * n
     cons = ({'type': 'eq', 'fun': lambda w: np.sum(w) - 1},)
+
+    # Warm-start from the tangency weights clipped into the box — usually a
+    # few SLSQP iterations from the optimum instead of starting at 1/n
     x0 = np.ones(n) / n
+    if w_tan is not None:
+        lo, hi = bounds[0]
+        clipped = np.clip(w_tan, lo, hi)
+        total = clipped.sum()
+        if total > 1e-12:
+            x0 = clipped / total
 
-    opt = minimize(neg_sharpe, x0, bounds=bounds, constraints=cons, method='SLSQP')
+    opt = minimize(neg_sharpe_and_grad, x0, jac=True, bounds=bounds,
+                   constraints=cons, method='SLSQP')
     if not opt.success:
         logging.warning("Optimization issue: %s", opt.message)
 
-    w = opt.x
-    port_ret, port_vol, sharpe = portfolio_stats(w, mu_arr, cov_arr, risk_free)
-    return pd.Series(w, index=mu.index), port_ret, port_vol, sharpe
+    return opt.x
 
 
 # -------------------------------------------------------------------------
@@ -76,8 +178,10 @@ def compute_efficient_frontier(mu, cov, risk_free=0.02, allow_shorts=False, num_
     Returns a DataFrame with annualized portfolio metrics.
     VaR and CVaR are expressed as *negative losses* (e.g., -0.20 = -20% loss).
     """
-    mu_arr = np.asarray(mu)
-    cov_arr = np.asarray(cov)
+    mu_arr = np.asarray(mu, dtype=float)
+    # Fortran order once, outside the sweep — portfolio_stats' BLAS matvec
+    # would otherwise copy Σ on every frontier point
+    cov_arr = np.asfortranarray(cov, dtype=float)
     n = len(mu_arr)
     target_returns = np.linspace(mu_arr.min(), mu_arr.max(), num_points)
     results = []
@@ -86,6 +190,14 @@ def compute_efficient_frontier(mu, cov, risk_free=0.02, allow_shorts=False, num_
     x0 = np.ones(n) / n
     z = 1.65  # 95% confidence level
 
+    if allow_shorts:
+        df = _frontier_two_fund(mu_arr, cov_arr, risk_free, target_returns, z)
+        if df is not None:
+            return df
+
+    # Long-only (or degenerate Σ): box constraints bind, so each point is
+    # an SLSQP solve — but neighbouring targets have neighbouring optima,
+    # so warm-starting from the previous solution cuts iterations sharply.
     for target_ret in target_returns:
         cons = (
             {'type': 'eq', 'fun': lambda w: np.sum(w) - 1},
@@ -97,6 +209,7 @@ def compute_efficient_frontier(mu, cov, risk_free=0.02, allow_shorts=False, num_
             continue
 
         w = opt.x
+        x0 = w
         port_ret, port_vol, sharpe = portfolio_stats(w, mu_arr, cov_arr, risk_free)
 
         # ✅ VaR & CVaR as LOSS values (negative convention)
@@ -109,6 +222,51 @@ def compute_efficient_frontier(mu, cov, risk_free=0.02, allow_shorts=False, num_
     return pd.DataFrame(results, columns=["Return", "Volatility", "Sharpe", "VaR", "CVaR"])
 
 
+def _frontier_two_fund(mu_arr, cov_arr, risk_free, target_returns, z):
+    """Analytic frontier via two-fund separation (shorts allowed).
+
+    Min-variance weights for target return r are w(r) = g + h·r with
+    g, h linear combos of Σ⁻¹1 and Σ⁻¹μ — the whole sweep is two Cholesky
+    solves plus vectorized algebra, no per-point optimizer. Returns None
+    when Σ is singular or μ is degenerate so the caller can fall back to
+    SLSQP; points whose weights leave the (-1, 1) box are dropped, matching
+    the bounds the numeric path enforces.
+    """
+    n = len(mu_arr)
+    ones = np.ones(n)
+    try:
+        factor = cho_factor(cov_arr + 1e-10 * np.eye(n))
+    except np.linalg.LinAlgError:
+        return None
+    inv_one = cho_solve(factor, ones)
+    inv_mu = cho_solve(factor, mu_arr)
+
+    A = ones @ inv_one
+    B = mu_arr @ inv_one
+    C = mu_arr @ inv_mu
+    D = A * C - B * B
+    if not np.isfinite(D) or D <= 1e-18:
+        return None
+
+    g = (C * inv_one - B * inv_mu) / D
+    h = (A * inv_mu - B * inv_one) / D
+    w_matrix = g[:, None] + np.outer(h, target_returns)  # n × num_points
+
+    in_box = (np.abs(w_matrix) <= 1).all(axis=0)
+    w_matrix = w_matrix[:, in_box]
+    if w_matrix.shape[1] == 0:
+        return None
+
+    rets = mu_arr @ w_matrix
+    vols = np.sqrt(np.einsum('ik,ij,jk->k', w_matrix, cov_arr, w_matrix))
+    sharpes = (rets - risk_free) / vols
+    VaR = -(z * vols - rets)
+    CVaR = -((vols * (np.exp(-z ** 2 / 2) / (np.sqrt(2 * np.pi) * 0.05))) - rets)
+
+    return pd.DataFrame({"Return": rets, "Volatility": vols, "Sharpe": sharpes,
+                         "VaR": VaR, "CVaR": CVaR})
+
+
 # -------------------------------------------------------------------------
 # 3️⃣ Plot Efficient Frontier with Metrics
 # -------------------------------------------------------------------------
@@ -28,15 +28,19 @@ def compute_returns_and_stats(price_panel, freq_per_year=252):
     cov_annual : pd.DataFrame
         Annualized covariance matrix.
     """
-    # Compute log returns
-    ret = np.log(price_panel).diff().dropna()
+    # Compute log returns on the raw ndarray (one allocation, no pandas
+    # alignment passes); wrap back into pandas once at the end.
+    arr = price_panel.to_numpy(dtype=float)
+    logp = np.log(arr)
+    logret = logp[1:] - logp[:-1]
 
-    # Daily statistics
-    mu_daily = ret.mean()
-    cov_daily = ret.cov()
+    ret = pd.DataFrame(logret, index=price_panel.index[1:], columns=price_panel.columns)
 
     # Annualized statistics (multiply mean by freq, covariance by freq)
-    mu_annual = mu_daily * freq_per_year
-    cov_annual = cov_daily * freq_per_year
+    mu_annual = pd.Series(logret.mean(axis=0) * freq_per_year, index=price_panel.columns)
+    cov_annual = pd.DataFrame(
+        np.atleast_2d(np.cov(logret, rowvar=False, ddof=1)) * freq_per_year,
+        index=price_panel.columns, columns=price_panel.columns
+    )
 
     return ret, mu_annual, cov_annual